@@ -1,85 +1,113 @@
 import json
 import re
+import sys
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import requests
 
-EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$")
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = lambda obj: orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:  # orjson is optional; stdlib json gives the same cache file
+    _json_loads = json.loads
+    _json_dumps = lambda obj: json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}$", re.ASCII)
 ALLOWED_TITLES = {"Mr.", "Mrs.", "Ms.", "Dr.", ""}
+# Salutation with dots stripped and lower-cased -> CB Title
+CB_TITLE_MAP = {"mr": "Mr.", "mrs": "Mrs.", "ms": "Ms.", "dr": "Dr."}
+CB_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _isna(x) -> bool:
+    # Scalar-only NaN check; cheaper than pd.isna's generic dispatch
+    return x is None or x is pd.NA or (isinstance(x, float) and x != x)
 
 
 def clean_str(x) -> str:
-    if pd.isna(x):
+    if _isna(x):
         return ""
     return str(x).strip()
 
 
-def normalize_email(x) -> str:
-    s = clean_str(x).lower()
-    if not s:
-        return ""
-    return s if EMAIL_RE.match(s) else ""
+def clean_str_series(df: pd.DataFrame, col: str) -> pd.Series:
+    """Column-wise clean_str; a missing column reads as all empty strings."""
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].astype("string").fillna("").str.strip()
 
 
-def normalize_salutation_to_cb_title(x) -> str:
-    s = clean_str(x).replace(".", "").lower()
-    mapping = {"mr": "Mr.", "mrs": "Mrs.", "ms": "Ms.", "dr": "Dr."}
-    return mapping.get(s, "")
+def normalize_email_series(s: pd.Series) -> pd.Series:
+    """Trim and lower-case emails; anything not matching EMAIL_RE becomes ""."""
+    emails = s.astype("string").fillna("").str.strip().str.lower()
+    # Pass the pattern string: a compiled re.Pattern forces pandas onto a per-element
+    # Python fallback, while a plain pattern runs in Arrow's regex kernel.
+    return emails.where(emails.str.match(EMAIL_RE.pattern), "")
 
 
-def parse_created_at(x) -> str:
-    s = clean_str(x)
-    if not s:
-        return ""
-    dt = pd.to_datetime(s, errors="coerce")
-    if pd.isna(dt):
-        return ""
-    dt = dt.normalize()
-    return dt.strftime("%Y-%m-%d %H:%M:%S")
+def normalize_salutation_to_cb_title_series(s: pd.Series) -> pd.Series:
+    """Map salutations (any case, dots optional) via CB_TITLE_MAP; unknown -> ""."""
+    return s.str.replace(".", "", regex=False).str.lower().map(CB_TITLE_MAP).fillna("")
 
 
-def split_tags(x) -> List[str]:
-    s = clean_str(x)
-    if not s:
-        return []
-    return [t.strip() for t in s.split(",") if t.strip()]
+def parse_created_at(s: pd.Series) -> pd.Series:
+    """
+    Parse a whole date column in one call ("" if missing/unparseable).
+    The source export mixes "Jan 19, 2020" and "04/19/2022", hence format="mixed".
+    """
+    dt = pd.to_datetime(s, errors="coerce", format="mixed")
+    return dt.dt.normalize().dt.strftime(CB_DATETIME_FORMAT).fillna("")
 
 
-def dedupe_preserve_order(items: List[str]) -> List[str]:
-    seen = set()
-    out = []
-    for i in items:
-        if i not in seen:
-            out.append(i)
-            seen.add(i)
-    return out
+def tag_map_series(tag_map: Dict[str, str]) -> pd.Series:
+    """Build the tag lookup once per run (see explode_tags); strings are interned."""
+    return pd.Series({sys.intern(k): sys.intern(v) for k, v in tag_map.items()}, dtype=object)
 
 
-def parse_amount(x) -> Optional[float]:
-    if pd.isna(x):
-        return None
-    s = clean_str(x).replace("$", "").replace(",", "")
-    if not s:
-        return None
-    try:
-        return float(s)
-    except ValueError:
-        return None
+def explode_tags(tags: pd.Series, tag_map: pd.Series) -> pd.Series:
+    """
+    Split comma-separated tags into one row per tag (source index repeated),
+    mapped via tag_map with the original tag as fallback. Empty tags are dropped.
+    """
+    s = tags.str.split(",").explode().str.strip()
+    s = s[s != ""]
+    # astype: map() over no rows comes back float, which has no .str accessor
+    s = s.map(tag_map).fillna(s).astype(str).str.strip()
+    return s[s != ""]
 
 
-def fmt_currency(x: Optional[float]) -> str:
-    if x is None or pd.isna(x):
-        return ""
-    return f"${x:,.2f}"
+def fmt_currency_series(s: pd.Series) -> pd.Series:
+    """Format amounts as $1,234.56; NaN is skipped by map and becomes ""."""
+    return s.map("${:,.2f}".format, na_action="ignore").fillna("")
 
 
-def infer_constituent_type(first_name: str, last_name: str, company: str) -> str:
+def infer_constituent_type_series(first_name: pd.Series, last_name: pd.Series, company: pd.Series) -> pd.Series:
     # Assumption: Company only if company filled and no person name
-    if company and not first_name and not last_name:
-        return "Company"
-    return "Person"
+    is_company = (company != "") & (first_name == "") & (last_name == "")
+    return pd.Series(np.where(is_company, "Company", "Person"), index=company.index)
+
+
+def read_input_csv(path, columns: List[str]) -> pd.DataFrame:
+    """
+    Read only the given columns (those present in the file) with the PyArrow engine.
+    The exports carry many empty trailing columns, so skipping them saves parse time.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in columns if c in header]
+    return pd.read_csv(path, engine="pyarrow", dtype_backend="pyarrow", usecols=usecols)
+
+
+def write_output_csv(df: pd.DataFrame, path: Path) -> None:
+    """Write df (no index) with Arrow's C++ CSV writer in batches. String cells are quoted."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pa_csv.write_csv(table, path, write_options=pa_csv.WriteOptions(batch_size=64_000))
 
 
 def fetch_tag_mapping(url: str, cache_file: Path) -> Dict[str, str]:
@@ -90,7 +118,7 @@ def fetch_tag_mapping(url: str, cache_file: Path) -> Dict[str, str]:
     """
     if cache_file.exists():
         try:
-            return json.loads(cache_file.read_text(encoding="utf-8"))
+            return _json_loads(cache_file.read_bytes())
         except Exception:
             pass
 
@@ -106,61 +134,87 @@ def fetch_tag_mapping(url: str, cache_file: Path) -> Dict[str, str]:
                 mapping[name] = mapped
 
         cache_file.parent.mkdir(parents=True, exist_ok=True)
-        cache_file.write_text(json.dumps(mapping, indent=2, ensure_ascii=False), encoding="utf-8")
+        cache_file.write_bytes(_json_dumps(mapping))
         return mapping
     except Exception:
         return {}
 
 
-def build_email_lookup(df_emails: pd.DataFrame) -> Dict[str, List[str]]:
-    df = df_emails.copy()
-    df["Patron ID"] = df["Patron ID"].astype(str).str.strip()
-    df["Email_norm"] = df["Email"].apply(normalize_email)
-    df = df[df["Email_norm"] != ""]
-    return df.groupby("Patron ID")["Email_norm"].apply(lambda s: sorted(set(s.tolist()))).to_dict()
-
+def build_email_lookup(df_emails: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a DataFrame indexed by patron_id with "Candidate 1"/"Candidate 2":
+    the first two distinct valid emails in sorted order ("" if fewer).
+    """
+    df = pd.DataFrame(
+        {
+            "Patron ID": df_emails["Patron ID"].astype(str).str.strip(),
+            "Email_norm": normalize_email_series(df_emails["Email"]),
+        }
+    )
+    df = df[df["Email_norm"] != ""].drop_duplicates().sort_values(["Patron ID", "Email_norm"])
+    df["Rank"] = df.groupby("Patron ID", sort=False).cumcount()
+    return (
+        df[df["Rank"] < 2]
+        .pivot(index="Patron ID", columns="Rank", values="Email_norm")
+        .reindex(columns=[0, 1])
+        .fillna("")
+        .set_axis(["Candidate 1", "Candidate 2"], axis=1)
+    )
 
-def pick_email1_email2(patron_id: str, primary_email: str, emails_lookup: Dict[str, List[str]]) -> Tuple[str, str]:
-    primary = normalize_email(primary_email)
-    candidates = emails_lookup.get(patron_id, [])
 
-    email1 = primary if primary else (candidates[0] if candidates else "")
-    if not email1:
-        return "", ""
+def pick_email1_email2(
+    patron_ids: pd.Series, primary_emails: pd.Series, emails_lookup: pd.DataFrame
+) -> Tuple[pd.Series, pd.Series]:
+    candidates = emails_lookup.reindex(patron_ids).fillna("")
+    cand1 = candidates["Candidate 1"].to_numpy(dtype=object)
+    cand2 = candidates["Candidate 2"].to_numpy(dtype=object)
+    primary = normalize_email_series(primary_emails).to_numpy(dtype=object)
 
-    email2 = ""
-    for e in candidates:
-        if e != email1:
-            email2 = e
-            break
-    return email1, email2
+    email1 = np.where(primary != "", primary, cand1)
+    # Candidates are distinct, so the first one != email1 is cand1 unless email1 is cand1
+    email2 = np.where(email1 == cand1, cand2, cand1)
+    return pd.Series(email1, index=patron_ids.index), pd.Series(email2, index=patron_ids.index)
 
 
 def build_donation_aggregates(df_don: pd.DataFrame):
     """
     Returns:
       lifetime_sum: dict[patron_id] -> float
-      most_recent: dict[patron_id] -> {"Date_dt": Timestamp, "Amount_num": float}
+      most_recent: DataFrame indexed by patron_id with "Date_dt" and "Amount_num"
     """
-    df = df_don.copy()
-    df["Patron ID"] = df["Patron ID"].astype(str).str.strip()
-    df["Amount_num"] = df["Donation Amount"].apply(parse_amount)
-    df["Date_dt"] = pd.to_datetime(df["Donation Date"], errors="coerce")
-
-    if "Status" in df.columns:
-        df = df[df["Status"].astype(str).str.strip().str.lower() == "paid"].copy()
-
-    lifetime = (
-        df.dropna(subset=["Amount_num"])
-        .groupby("Patron ID")["Amount_num"]
-        .sum()
-        .to_dict()
+    df = df_don[["Patron ID", "Donation Amount", "Donation Date"]]
+    if "Status" in df_don.columns:
+        df = df[df_don["Status"].astype(str).str.strip().str.lower().eq("paid")]
+
+    amount = (
+        df["Donation Amount"]
+        .astype("string")
+        .str.replace("$", "", regex=False)
+        .str.replace(",", "", regex=False)
+        .str.strip()
+    )
+    df = pd.DataFrame(
+        {
+            "Patron ID": df["Patron ID"].astype(str).str.strip().astype("category"),
+            "Amount_num": pd.to_numeric(amount, errors="coerce").astype(float),
+            "Date_dt": pd.to_datetime(df["Donation Date"], errors="coerce"),
+        }
     )
 
-    df_recent = df.dropna(subset=["Date_dt"]).copy()
-    if df_recent.empty:
-        return lifetime, {}
-
-    idx = df_recent.groupby("Patron ID")["Date_dt"].idxmax()
-    recent = df_recent.loc[idx, ["Patron ID", "Date_dt", "Amount_num"]].set_index("Patron ID")
-    return lifetime, recent.to_dict(orient="index")
+    agg = df.groupby("Patron ID", sort=False, observed=True).agg(
+        lifetime=("Amount_num", "sum"),
+        n_amounts=("Amount_num", "count"),
+        last_date=("Date_dt", "max"),
+    )
+    lifetime = agg["lifetime"].where(agg["n_amounts"] > 0).dropna().to_dict()
+
+    # First donation per patron on its latest date (same row idxmax would pick)
+    last_date = agg["last_date"].reindex(df["Patron ID"]).to_numpy()
+    is_latest = df["Date_dt"].eq(last_date)
+    recent = (
+        df.loc[is_latest, ["Patron ID", "Date_dt", "Amount_num"]]
+        .drop_duplicates(subset=["Patron ID"], keep="first")
+        .set_index("Patron ID")
+    )
+    recent.index = recent.index.astype(str)
+    return lifetime, recent
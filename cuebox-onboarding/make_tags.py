@@ -4,7 +4,14 @@ from pathlib import Path
 import pandas as pd
 
 from config import DEFAULT_CACHE_FILE, DEFAULT_TAG_MAPPING_URL
-from helpers import clean_str, dedupe_preserve_order, fetch_tag_mapping, split_tags
+from helpers import (
+    clean_str_series,
+    explode_tags,
+    fetch_tag_mapping,
+    read_input_csv,
+    tag_map_series,
+    write_output_csv,
+)
 
 
 def main():
@@ -18,44 +25,37 @@ def main():
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
-    df_c = pd.read_csv(args.constituents)
+    df_c = read_input_csv(args.constituents, ["Patron ID", "Tags"])
     df_c["Patron ID"] = df_c["Patron ID"].astype(str).str.strip()
 
-    tag_map = fetch_tag_mapping(args.tag_mapping_url, Path(args.cache))
-    map_tag = lambda t: tag_map.get(t, t)
+    tag_map = tag_map_series(fetch_tag_mapping(args.tag_mapping_url, Path(args.cache)))
 
     # Build (Patron ID, Tag) pairs
-    pairs = []
-    for _, r in df_c.iterrows():
-        pid = clean_str(r.get("Patron ID"))
-        raw_tags = split_tags(r.get("Tags"))
-        mapped = [map_tag(t) for t in raw_tags]
-        mapped = [t.strip() for t in mapped if t and t.strip()]
-        mapped = dedupe_preserve_order(mapped)  # dedupe tags per constituent
-
-        for t in mapped:
-            pairs.append((pid, t))
-
-    if not pairs:
+    df_pairs = (
+        df_c[["Patron ID"]]
+        .join(explode_tags(clean_str_series(df_c, "Tags"), tag_map).rename("Tag"), how="inner")
+        # Dedupe tags per constituent
+        .drop_duplicates(subset=["Patron ID", "Tag"])
+        .astype({"Patron ID": "category", "Tag": "category"})
+    )
+
+    if df_pairs.empty:
         df_out = pd.DataFrame(columns=["CB Tag Name", "CB Tag Count"])
-        df_out.to_csv(out_path, index=False)
+        write_output_csv(df_out, out_path)
         print(f"✅ Wrote {out_path} (0 tags)")
         return
 
-    df_pairs = pd.DataFrame(pairs, columns=["Patron ID", "Tag"])
-    # Dedupe any accidental duplicates
-    df_pairs = df_pairs.drop_duplicates(subset=["Patron ID", "Tag"])
-
     # Count unique constituents per tag
     df_out = (
-        df_pairs.groupby("Tag")["Patron ID"]
+        df_pairs.groupby("Tag", observed=True)["Patron ID"]
         .nunique()
         .reset_index()
+        .astype({"Tag": str})
         .rename(columns={"Tag": "CB Tag Name", "Patron ID": "CB Tag Count"})
         .sort_values(by=["CB Tag Count", "CB Tag Name"], ascending=[False, True])
     )
 
-    df_out.to_csv(out_path, index=False)
+    write_output_csv(df_out, out_path)
     print(f"✅ Wrote {out_path} ({len(df_out)} tags)")
 
 